@@ -10,14 +10,42 @@ common parts of the output into JSON. It's designed to be simple and
 work for typical SATA and NVMe outputs.
 """
 import argparse
+import asyncio
+import contextlib
+import functools
+import hashlib
+import io
+import itertools
 import json
 import shutil
 import subprocess
 import sys
-from typing import Dict, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is used when it is missing
+    orjson = None
 
+
+def _dumps(obj) -> str:
+    # orjson is much faster on large multi-drive dumps. Both backends write
+    # non-ASCII (e.g. U+FFFD from undecodable smartctl output) unescaped, and
+    # orjson hands integers wider than 64 bits over to json.
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+        except TypeError:  # orjson.JSONEncodeError
+            pass
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+@functools.lru_cache(maxsize=1)
 def find_smartctl() -> Optional[str]:
+    # PATH lookup is cached for long-running callers; call
+    # find_smartctl.cache_clear() after PATH or smartctl itself changes
     return shutil.which("smartctl")
 
 
@@ -46,143 +74,363 @@ def run_smartctl(smartctl: str, device: str) -> str:
     return p.stdout
 
 
-def parse_smart_output(output: str) -> Dict:
-    # Very small parser for key fields and Attribute table
-    data: Dict = {}
-    lines = output.splitlines()
+async def arun_smartctl(smartctl: str, device: str) -> str:
+    """Async variant of run_smartctl, so several drives can be queried at once."""
+    proc = await asyncio.create_subprocess_exec(
+        smartctl, "-a", device, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    out, err = await proc.communicate()
+    stdout = out.decode(errors="replace")
+    if proc.returncode != 0:
+        # smartctl returns non-zero for some drives - keep stdout/stderr anyway
+        return stdout + "\n" + err.decode(errors="replace")
+    return stdout
+
+
+def run_smartctl_all(smartctl: str, devices: List[str]) -> List[str]:
+    """Run smartctl -a on every device concurrently; outputs follow `devices` order."""
+    async def gather() -> List[str]:
+        return await asyncio.gather(*(arun_smartctl(smartctl, d) for d in devices))
+    return asyncio.run(gather())
+
+
+def iter_smartctl(smartctl: str, device: str) -> Iterator[str]:
+    """Yield `smartctl -a` output line by line instead of buffering it whole."""
+    # stderr is merged into stdout (run_smartctl appends it on failure too),
+    # so an unread stderr pipe can never fill up and stall smartctl.
+    # Decode like arun_smartctl: invalid bytes (e.g. in vendor model strings)
+    # become U+FFFD instead of aborting the parse.
+    p = subprocess.Popen(
+        [smartctl, "-a", device], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        encoding="utf-8", errors="replace", bufsize=1,
+    )
+    try:
+        yield from p.stdout
+    finally:
+        p.stdout.close()
+        p.wait()
+
+
+# "Label: value" lines copied verbatim into the parsed dict, label -> key
+_FIELD_MAP = {
+    "Device Model": "model",
+    "Model Number": "model",  # NVMe
+    "Serial Number": "serial",
+    "Firmware Version": "firmware",
+    "SMART overall-health self-assessment test result": "health",
+}
+
+# line classes keyed on the first character, so most lines skip the
+# startswith() tests that cannot match them
+_ATTR_ROW, _SMART_LINE, _ID_LINE = 1, 2, 3
+_LINE_KIND = dict.fromkeys("0123456789", _ATTR_ROW)
+_LINE_KIND["S"] = _SMART_LINE
+_LINE_KIND["I"] = _ID_LINE
+
+# headers that close the NVMe SMART/Health Information section
+_NVME_SECTION_END = ("Error Information", "Self-test Log", "===")
+
+# ATA logs printed after the attribute tables; parsing stops at the first one
+_ATA_TRAILING_LOGS = (
+    "SMART Error Log",
+    "SMART Extended Comprehensive Error Log",
+    "SMART Self-test log",
+    "SMART Extended Self-test Log",
+)
+
+_INFO_SECTION = "=== START OF INFORMATION SECTION ==="
+
+# non-blank lines inspected to tell ATA from NVMe output
+_FLAVOR_PROBE_LINES = 30
+
+
+def _parse_nvme_value(raw: str) -> Tuple[Union[int, float, str], Optional[str]]:
+    """Split an NVMe health value like '1,778,273 [910 GB]' into (value, unit).
+
+    Walks the string once: optional sign, digits (commas allowed), optional
+    fraction, optional inline unit ('Celsius', '%'), then an optional
+    bracketed unit which takes precedence. Hex values such as '0x00' are
+    decoded. When no number is found the raw string is returned as value.
+    """
+    n = len(raw)
+    i = 0
+    while i < n and raw[i] == " ":
+        i += 1
+    start = i
+    if i < n and raw[i] in "+-":
+        i += 1
+    digits = i
+    while i < n and ("0" <= raw[i] <= "9" or (raw[i] == "," and i > digits)):
+        i += 1
+    is_hex = raw[digits:i] == "0" and i < n and raw[i] in "xX"
+    if i == digits or (is_hex and digits != start):
+        # no number, or a signed hex value which smartctl never prints
+        value: Union[int, float, str] = raw
+        i = start
+    elif is_hex:
+        # skip the "x" even if no hex digits follow, so it is not read as a unit
+        i += 1
+        j = i
+        while j < n and raw[j] in "0123456789abcdefABCDEF":
+            j += 1
+        value = int(raw[i:j], 16) if j > i else 0
+        i = j
+    else:
+        is_float = False
+        if i + 1 < n and raw[i] == "." and "0" <= raw[i + 1] <= "9":
+            is_float = True
+            i += 1
+            while i < n and "0" <= raw[i] <= "9":
+                i += 1
+        # the slice is plain ASCII; bytes.translate drops thousands separators
+        # in C and int()/float() accept bytes directly
+        num = raw[start:i].encode("ascii").translate(None, b",")
+        value = float(num) if is_float else int(num)
+    unit: Optional[str] = None
+    if value is not raw:
+        while i < n and raw[i] == " ":
+            i += 1
+        u = i
+        while i < n and (raw[i].isalpha() or raw[i] == "%"):
+            i += 1
+        if i > u:
+            unit = raw[u:i]
+    b = raw.find("[", i)
+    if b != -1:
+        e = raw.find("]", b + 1)
+        if e != -1:
+            unit = raw[b + 1:e]
+    return value, unit
+
+
+def _parse_attr_rows(rows: List[str]) -> List[Dict]:
+    """Turn ATA attribute table rows into attribute dicts, in one batch."""
     attrs: List[Dict] = []
-    in_attr_table = False
-    attr_headers = None
-    in_nvme_health = False
-    nvme_section_lines: List[str] = []
+    append = attrs.append
+    for row in rows:
+        parts = row.split(None, 9)
+        # Typical ATA: ID, ATTRIBUTE_NAME, FLAG, VALUE, WORST, THRESH, TYPE, UPDATED, WHEN_FAILED, RAW_VALUE
+        if len(parts) < 10:
+            # Fallback: store raw line
+            append({"raw": row})
+            continue
+        id_, name, _flag, value, worst, thresh, type_, updated, when_failed, raw = parts
+        try:
+            id_ = int(id_)
+        except ValueError:
+            pass
+        append({
+            "id": id_,
+            "name": name,
+            "value": value,
+            "worst": worst,
+            "thresh": thresh,
+            "type": type_,
+            "updated": updated,
+            "when_failed": when_failed,
+            "raw": raw,
+        })
+    return attrs
+
+
+def _detect_flavor(head: List[str]) -> str:
+    """Tell NVMe from ATA output by looking at the first few lines."""
+    for line in head:
+        if "NVMe" in line or line.startswith("Model Number:"):
+            return "nvme"
+    return "ata"
+
+
+def _iter_text_lines(text: str, start: int) -> Iterator[str]:
+    # like text[start:].splitlines(), but lazy: no list of every line and no
+    # copy of the text, so unparsed trailing logs are never split at all
+    find = text.find
+    end = len(text)
+    while start < end:
+        nl = find("\n", start)
+        if nl == -1:
+            nl = end
+        yield text[start:nl]
+        start = nl + 1
+
+
+def _stripped_lines(lines: Iterable[str], raw_buf: Optional[io.StringIO]) -> Iterator[str]:
+    # strip once and drop blank lines; tee the untouched text into raw_buf
     for line in lines:
+        if raw_buf is not None:
+            raw_buf.write(line)
         line = line.strip()
-        if not line:
-            continue
-        if line.startswith("=== START OF INFORMATION SECTION ==="):
-            continue
-        if line.startswith("Device Model:") or line.startswith("Model Number:"):
-            data["model"] = line.split(":", 1)[1].strip()
-        elif line.startswith("Serial Number:"):
-            data["serial"] = line.split(":", 1)[1].strip()
-        elif line.startswith("Firmware Version:"):
-            data["firmware"] = line.split(":", 1)[1].strip()
-        elif line.startswith("SMART overall-health self-assessment test result:"):
-            data["health"] = line.split(":", 1)[1].strip()
-        elif line.startswith("SMART overall-health self-assessment test result"):
-            data.setdefault("notes", []).append(line)
-        elif line.startswith("Percentage Used:"):
-            data["percentage_used"] = line.split(":", 1)[1].strip()
-        # NVMe: "Model Number: Samsung SSD 970 EVO Plus 1TB" handled above
-        # NVMe health critical warning
-        elif line.startswith("critical_warning"):
-            data.setdefault("nvme_health", {})["critical_warning"] = line.split(":", 1)[1].strip()
-
-        # detect start of NVMe SMART/Health Information
-        if line.startswith("SMART/Health Information"):
-            in_nvme_health = True
-            nvme_section_lines = []
-            continue
-        if in_nvme_health:
-            # NVMe SMART/Health section ends when an empty line or another section starts
-            if line.startswith("Error Information") or line.startswith("Self-test Log") or line.startswith("==="):
-                in_nvme_health = False
-            else:
-                nvme_section_lines.append(line)
+        if line:
+            yield line
 
-        # Attribute table detection (ATA)
-        if line.startswith("ID#") and "ATTRIBUTE_NAME" in line or line.startswith("ID#") and "ATTRIBUTE_NAME" not in line and "FLAG" in line:
-            in_attr_table = True
-            attr_headers = line
-            continue
+
+def _parse_ata(lines: Iterable[str], data: Dict) -> None:
+    attr_rows: List[str] = []
+    in_attr_table = False
+    for line in lines:
+        kind = _LINE_KIND.get(line[0])
         if in_attr_table:
             # table rows normally start with a number
-            if line[0].isdigit():
-                parts = line.split()
-                # Typical ATA: ID, ATTRIBUTE_NAME, FLAG, VALUE, WORST, THRESH, TYPE, UPDATED, WHEN_FAILED, RAW_VALUE
-                if len(parts) >= 10:
-                    try:
-                        id_ = int(parts[0])
-                    except ValueError:
-                        id_ = parts[0]
-                    attr = {
-                        "id": id_,
-                        "name": parts[1],
-                        "value": parts[3],
-                        "worst": parts[4],
-                        "thresh": parts[5],
-                        "type": parts[6],
-                        "updated": parts[7],
-                        "when_failed": parts[8],
-                        "raw": " ".join(parts[9:]),
-                    }
-                    attrs.append(attr)
-                else:
-                    # Fallback: store raw line
-                    attrs.append({"raw": line})
-            else:
-                # end of table
-                in_attr_table = False
+            if kind == _ATTR_ROW:
+                attr_rows.append(line)
+                continue
+            # end of table; failing drives print a short "Failed Attributes"
+            # table before the full one, so keep going
+            in_attr_table = False
+        if kind == _SMART_LINE and line.startswith(_ATA_TRAILING_LOGS):
+            # nothing in the error and self-test logs is parsed
+            break
+        key, sep, value = line.partition(":")
+        if sep:
+            field = _FIELD_MAP.get(key)
+            if field is not None:
+                data[field] = value.strip()
+        elif kind == _SMART_LINE and line.startswith("SMART overall-health self-assessment test result"):
+            data.setdefault("notes", []).append(line)
+        # Attribute table detection
+        elif kind == _ID_LINE and line.startswith("ID#") and ("ATTRIBUTE_NAME" in line or "FLAG" in line):
+            in_attr_table = True
+    if attr_rows:
+        data["attributes"] = _parse_attr_rows(attr_rows)
+
+
+def _in_nvme_section(line: str) -> bool:
+    return not line.startswith(_NVME_SECTION_END)
 
-    if attrs:
-        data["attributes"] = attrs
-    # parse nvme health lines into structured fields
+
+def _parse_nvme(lines: Iterable[str], data: Dict) -> None:
+    nvme_section_lines: List[str] = []
+    it = iter(lines)
+    for line in it:
+        key, sep, value = line.partition(":")
+        if sep:
+            field = _FIELD_MAP.get(key)
+            if field is not None:
+                data[field] = value.strip()
+        elif _LINE_KIND.get(line[0]) == _SMART_LINE:
+            if line.startswith("SMART/Health Information"):
+                # slurp the section up to the next header in one go
+                nvme_section_lines = list(itertools.takewhile(_in_nvme_section, it))
+                # the error and self-test logs that follow are not parsed
+                break
+            elif line.startswith("SMART overall-health self-assessment test result"):
+                data.setdefault("notes", []).append(line)
     if nvme_section_lines:
-        # Build structured nvme fields: { key: { raw: str, value: int|float|str, unit: str|null } }
-        nv_struct: Dict[str, Dict] = {}
-        import re
-        for l in nvme_section_lines:
-            if ":" not in l:
-                continue
-            k, v = l.split(":", 1)
-            key = k.strip().lower().replace(" ", "_")
-            raw = v.strip()
-            field = {"raw": raw}
-            # try to extract number and unit
-            # match patterns like '1,778,299 [910 GB]' or '29 Celsius' or '100%'
-            # first try to find a bracketed unit (e.g. [910 GB])
-            br = re.search(r"\[(.*?)\]", raw)
-            if br:
-                # attempt to extract the primary numeric before bracket
-                m = re.search(r"([-+]?\d+[\d,]*)", raw)
-                if m:
-                    num = m.group(1).replace(",", "")
-                    try:
-                        field["value"] = int(num)
-                    except ValueError:
-                        try:
-                            field["value"] = float(num)
-                        except Exception:
-                            field["value"] = raw
-                field["unit"] = br.group(1)
-            else:
-                # look for number + optional unit
-                m2 = re.match(r"^\s*([-+]?\d+[\d,]*)(?:\s*(\w+%?|Celsius|KB|MB|GB|TB)?)", raw)
-                if m2:
-                    num = m2.group(1).replace(",", "")
-                    unit = m2.group(2) or None
-                    try:
-                        field["value"] = int(num)
-                    except ValueError:
-                        try:
-                            field["value"] = float(num)
-                        except Exception:
-                            field["value"] = raw
-                    field["unit"] = unit
-                else:
-                    field["value"] = raw
-                    field["unit"] = None
-            nv_struct[key] = field
-        data.setdefault("nvme_health", {}).update(nv_struct)
+        # "Critical Warning:" is part of the section and lands here as critical_warning
+        nv_struct = _parse_nvme_health(nvme_section_lines)
+        if "percentage_used" in nv_struct:
+            data["percentage_used"] = nv_struct["percentage_used"]["raw"]
+        data["nvme_health"] = nv_struct
+
+
+def _parse_nvme_health(section_lines: List[str]) -> Dict[str, Dict]:
+    # Build structured nvme fields: { key: { raw: str, value: int|float|str, unit: str|null } }
+    nv_struct: Dict[str, Dict] = {}
+    for l in section_lines:
+        k, sep, v = l.partition(":")
+        if not sep:
+            continue
+        # fixed keys are literals and already interned; these are built at
+        # runtime, so intern them to share one copy across parsed drives
+        key = sys.intern(k.strip().lower().replace(" ", "_"))
+        raw = v.strip()
+        value, unit = _parse_nvme_value(raw)
+        nv_struct[key] = {"raw": raw, "value": value, "unit": unit}
+    return nv_struct
+
+
+def parse_smart_output(output: Union[str, Iterable[str]], keep_raw: bool = True) -> Dict:
+    # Very small parser for key fields and Attribute table.
+    # `output` is either the whole text or an iterable of lines with their
+    # line endings (a file object, iter_smartctl()), which is consumed once.
+    # With keep_raw=False the smartctl text is not kept under "raw".
+    data: Dict = {}
+    raw_buf: Optional[io.StringIO] = None
+    if isinstance(output, str):
+        # the banner before the information section carries nothing we parse
+        lines: Iterator[str] = _iter_text_lines(output, max(output.find(_INFO_SECTION), 0))
+    else:
+        lines = iter(output)
+        if keep_raw:
+            raw_buf = io.StringIO()
+    stripped = _stripped_lines(lines, raw_buf)
+    # the output is either ATA or NVMe, so pick the matching parser once
+    # instead of testing for both kinds of sections on every line
+    head = list(itertools.islice(stripped, _FLAVOR_PROBE_LINES))
+    parse = _parse_nvme if _detect_flavor(head) == "nvme" else _parse_ata
+    parse(itertools.chain(head, stripped), data)
+    if raw_buf is not None:
+        # parsers stop after their last section; keep the rest for "raw"
+        for line in lines:
+            raw_buf.write(line)
     # include raw summary
-    data.setdefault("raw", output)
+    if keep_raw:
+        data.setdefault("raw", output if raw_buf is None else raw_buf.getvalue())
     return data
 
 
+# parse_smart_output_cached() results, most recently used last; the lock
+# guards every access since pollers often run one thread per drive
+_PARSE_CACHE: "OrderedDict[Tuple[str, bytes], Dict]" = OrderedDict()
+_PARSE_CACHE_SIZE = 64
+_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def parse_smart_output_cached(output: str, device: str = "") -> Dict:
+    """parse_smart_output() for pollers: unchanged output is parsed only once.
+
+    Results are keyed on the device and a SHA-1 of the output, and the last
+    64 are kept. Each call gets its own copy of the top-level dict; nested
+    values (attributes, nvme_health) are shared and must not be modified.
+    There is no "raw" entry.
+    """
+    h = hashlib.sha1()
+    # smartctl stamps every run with "Local Time is:", which is not parsed;
+    # leave that line out of the key so idle drives still hit the cache
+    i = output.find("Local Time is:")
+    if i == -1:
+        h.update(output.encode())
+    else:
+        j = output.find("\n", i)
+        h.update(output[:i].encode())
+        if j != -1:
+            h.update(output[j:].encode())
+    key = (device, h.digest())
+    with _PARSE_CACHE_LOCK:
+        parsed = _PARSE_CACHE.get(key)
+        if parsed is not None:
+            _PARSE_CACHE.move_to_end(key)
+            return dict(parsed)
+    # parse outside the lock so one slow drive does not stall the others
+    parsed = parse_smart_output(output, keep_raw=False)
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE[key] = parsed
+        _PARSE_CACHE.move_to_end(key)
+        if len(_PARSE_CACHE) > _PARSE_CACHE_SIZE:
+            _PARSE_CACHE.popitem(last=False)
+    return dict(parsed)
+
+
+def print_device(device: str, parsed: Dict) -> None:
+    print(f"Device: {device}")
+    print("Model:", parsed.get("model", "n/a"))
+    print("Serial:", parsed.get("serial", "n/a"))
+    print("Firmware:", parsed.get("firmware", "n/a"))
+    print("Health:", parsed.get("health", "n/a"))
+    if "attributes" in parsed:
+        print("\nSMART Attributes:\nID  Name  Value  Worst  Thresh  Raw")
+        for a in parsed["attributes"]:
+            if "id" in a:
+                print(f"{a['id']:>2}  {a.get('name',''):15} {a.get('value',''):>5} {a.get('worst',''):>5} {a.get('thresh',''):>6} {a.get('raw','')}")
+            else:
+                print(a.get("raw"))
+
+
 def main(argv=None):
     parser = argparse.ArgumentParser(description="View SMART info via smartctl")
     parser.add_argument("--list", action="store_true", help="List detected devices")
     parser.add_argument("--device", help="Device path, e.g. /dev/sda or /dev/nvme0n1")
+    parser.add_argument("--all", action="store_true", help="Query all detected devices concurrently")
     parser.add_argument("--json", action="store_true", help="Output JSON")
     parser.add_argument("--include-raw", action="store_true", help="Include raw smartctl output in JSON")
     args = parser.parse_args(argv)
@@ -199,37 +447,46 @@ def main(argv=None):
             print("Failed to list devices:", e, file=sys.stderr)
             return 3
         if args.json:
-            print(json.dumps({"devices": devices}, indent=2))
+            print(_dumps({"devices": devices}))
         else:
             for d in devices:
                 print(d)
         return 0
 
+    # by default, omit the raw dump from JSON to keep output clean; include with --include-raw.
+    # The text view never shows it, so it is only kept when actually asked for.
+    keep_raw = args.json and args.include_raw
+    if args.all:
+        try:
+            devices = list_devices(smartctl)
+        except RuntimeError as e:
+            print("Failed to list devices:", e, file=sys.stderr)
+            return 3
+        # --scan may list one path several times (e.g. "-d megaraid,N" behind
+        # one controller); list_devices drops "-d", so query each path once
+        devices = list(dict.fromkeys(devices))
+        outputs = run_smartctl_all(smartctl, devices)
+        results = {d: parse_smart_output(out, keep_raw=keep_raw) for d, out in zip(devices, outputs)}
+        if args.json:
+            print(_dumps(results))
+        else:
+            for i, (d, parsed) in enumerate(results.items()):
+                if i:
+                    print()
+                print_device(d, parsed)
+        return 0
+
     if not args.device:
-        print("Please specify --device or --list", file=sys.stderr)
+        print("Please specify --device, --all or --list", file=sys.stderr)
         return 2
 
-    output = run_smartctl(smartctl, args.device)
-    parsed = parse_smart_output(output)
-    # by default, omit the raw dump from JSON to keep output clean; include with --include-raw
+    # closing stops smartctl if the parser finished before its output did
+    with contextlib.closing(iter_smartctl(smartctl, args.device)) as lines:
+        parsed = parse_smart_output(lines, keep_raw=keep_raw)
     if args.json:
-        to_print = dict(parsed)
-        if not args.include_raw and "raw" in to_print:
-            del to_print["raw"]
-        print(json.dumps(to_print, indent=2))
+        print(_dumps(parsed))
     else:
-        print(f"Device: {args.device}")
-        print("Model:", parsed.get("model", "n/a"))
-        print("Serial:", parsed.get("serial", "n/a"))
-        print("Firmware:", parsed.get("firmware", "n/a"))
-        print("Health:", parsed.get("health", "n/a"))
-        if "attributes" in parsed:
-            print("\nSMART Attributes:\nID  Name  Value  Worst  Thresh  Raw")
-            for a in parsed["attributes"]:
-                if "id" in a:
-                    print(f"{a['id']:>2}  {a.get('name',''):15} {a.get('value',''):>5} {a.get('worst',''):>5} {a.get('thresh',''):>6} {a.get('raw','')}")
-                else:
-                    print(a.get("raw"))
+        print_device(args.device, parsed)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,13 @@
+import asyncio
+import io
 import json
 import subprocess
 import sys
 
 import pytest
 
-from smart_info import parse_smart_output, run_smartctl, find_smartctl
+import smart_info
+from smart_info import _dumps, iter_smartctl, parse_smart_output, parse_smart_output_cached, run_smartctl, find_smartctl, _parse_nvme_value
 
 
 SAMPLE_ATA = """
@@ -44,6 +47,43 @@ Error Information Log Entries:      0
 No Errors Logged
 \n"""
 
+SAMPLE_ATA_FAILING = """
+smartctl 7.4 2023-08-01 r5530 [x86_64-linux-6.8.0] (local build)
+
+=== START OF INFORMATION SECTION ===
+Device Model:     FailDisk 2TB
+Serial Number:    ZZZ999
+Firmware Version: 2.00
+
+=== START OF READ SMART DATA SECTION ===
+SMART overall-health self-assessment test result: FAILED!
+Drive failure expected in less than 24 hours. SAVE ALL DATA.
+See vendor-specific Attribute list for failed Attributes.
+
+Failed Attributes:
+ID# ATTRIBUTE_NAME          FLAG     VALUE WORST THRESH TYPE      UPDATED  WHEN_FAILED RAW_VALUE
+  5 Reallocated_Sector_Ct   0x0033   001   001   036    Pre-fail  Always   FAILING_NOW 4095
+
+General SMART Values:
+Offline data collection status:  (0x00)\tOffline data collection activity
+\t\t\t\t\twas never started.
+
+SMART Attributes Data Structure revision number: 16
+Vendor Specific SMART Attributes with Thresholds:
+ID# ATTRIBUTE_NAME          FLAG     VALUE WORST THRESH TYPE      UPDATED  WHEN_FAILED RAW_VALUE
+  5 Reallocated_Sector_Ct   0x0033   001   001   036    Pre-fail  Always   FAILING_NOW 4095
+  9 Power_On_Hours          0x0032   071   071   000    Old_age   Always       -       25812
+194 Temperature_Celsius     0x0022   038   050   000    Old_age   Always       -       38 (Min/Max 18/50)
+
+SMART Error Log Version: 1
+ATA Error Count: 2
+Error 2 occurred at disk power-on lifetime: 25800 hours (1075 days + 0 hours)
+
+SMART Self-test log structure revision number 1
+Num  Test_Description    Status                  Remaining  LifeTime(hours)  LBA_of_first_error
+# 1  Short offline       Completed: read failure       90%     25810         123456
+"""
+
 
 def test_parse_ata():
     parsed = parse_smart_output(SAMPLE_ATA)
@@ -55,11 +95,33 @@ def test_parse_ata():
     assert any(a.get("name") == "Raw_Read_Error_Rate" for a in parsed["attributes"]) 
 
 
+def test_parse_ata_failing():
+  parsed = parse_smart_output(SAMPLE_ATA_FAILING)
+  assert parsed["model"] == "FailDisk 2TB"
+  assert parsed["health"] == "FAILED!"
+  assert "nvme_health" not in parsed
+  # the short "Failed Attributes" table is followed by the full one; the
+  # logs after it are not parsed
+  names = [a["name"] for a in parsed["attributes"]]
+  assert names == ["Reallocated_Sector_Ct", "Reallocated_Sector_Ct", "Power_On_Hours", "Temperature_Celsius"]
+  assert parsed["attributes"][-1]["raw"] == "38 (Min/Max 18/50)"
+
+
+def test_detect_flavor():
+  assert smart_info._detect_flavor(["Model Number: UMIS RPJYJ1T24RLS1QWY"]) == "nvme"
+  assert smart_info._detect_flavor(["Device Model: TestDisk 1TB"]) == "ata"
+  assert "attributes" not in parse_smart_output(SAMPLE_NVME)
+  assert "nvme_health" in parse_smart_output(SAMPLE_NVME)
+  assert "nvme_health" not in parse_smart_output(SAMPLE_ATA)
+
+
 def test_find_smartctl_not_found(monkeypatch):
     monkeypatch.setattr(sys, 'platform', 'linux')
     # simulate not found by temporarily changing PATH
     monkeypatch.setenv('PATH', '')
+    find_smartctl.cache_clear()
     assert find_smartctl() is None
+    find_smartctl.cache_clear()
 
 
 def test_parse_nvme():
@@ -72,8 +134,126 @@ def test_parse_nvme():
   # structured fields: each is a dict with raw/value/unit
   assert "percentage_used" in nv and isinstance(nv["percentage_used"], dict)
   assert nv["percentage_used"]["raw"] == "0%"
+  assert parsed["percentage_used"] == "0%"
   assert nv["percentage_used"]["value"] == 0
   assert nv["temperature"]["value"] == 29
   assert nv["power_on_hours"]["value"] == 41
   assert nv["data_units_read"]["value"] == 1778273
   assert nv["data_units_written"]["value"] == 2725721
+  assert nv["critical_warning"]["raw"] == "0x00"
+
+
+def test_parse_nvme_value():
+  assert _parse_nvme_value("1,778,273 [910 GB]") == (1778273, "910 GB")
+  assert _parse_nvme_value("29 Celsius") == (29, "Celsius")
+  assert _parse_nvme_value("100%") == (100, "%")
+  assert _parse_nvme_value("0x04") == (4, None)
+  assert _parse_nvme_value("0x") == (0, None)
+  assert _parse_nvme_value("-0x1") == ("-0x1", None)
+  assert _parse_nvme_value("1.5 W") == (1.5, "W")
+  assert _parse_nvme_value("No Errors Logged") == ("No Errors Logged", None)
+
+
+def test_parse_lines_iterable():
+  parsed = parse_smart_output(io.StringIO(SAMPLE_NVME))
+  assert parsed == parse_smart_output(SAMPLE_NVME)
+  assert parsed["raw"] == SAMPLE_NVME
+
+
+def test_parse_without_raw():
+  parsed = parse_smart_output(SAMPLE_ATA, keep_raw=False)
+  assert "raw" not in parsed
+  assert parsed["model"] == "TestDisk 1TB"
+
+
+def test_parse_cached():
+  first = parse_smart_output_cached(SAMPLE_ATA, "/dev/sda")
+  assert first == parse_smart_output(SAMPLE_ATA, keep_raw=False)
+  # a new timestamp alone does not force a reparse
+  stamped = SAMPLE_ATA.replace("Firmware Version", "Local Time is: Thu Oct 15 10:00:00 2026\nFirmware Version")
+  restamped = stamped.replace("10:00:00", "10:05:00")
+  assert parse_smart_output_cached(stamped, "/dev/sda")["attributes"] is parse_smart_output_cached(restamped, "/dev/sda")["attributes"]
+  assert parse_smart_output_cached(SAMPLE_ATA, "/dev/sda")["attributes"] is first["attributes"]
+  assert parse_smart_output_cached(SAMPLE_ATA, "/dev/sdb")["attributes"] is not first["attributes"]
+
+
+def test_parse_cached_returns_copies():
+  first = parse_smart_output_cached(SAMPLE_NVME, "/dev/nvme0")
+  del first["model"]
+  first["health"] = "FAILED"
+  again = parse_smart_output_cached(SAMPLE_NVME, "/dev/nvme0")
+  assert again["model"] == "UMIS RPJYJ1T24RLS1QWY"
+  assert again["health"] == "PASSED"
+
+
+def test_parse_cached_threads():
+  from concurrent.futures import ThreadPoolExecutor
+  # more distinct outputs than cache slots, so hits race with evictions
+  outputs = [SAMPLE_ATA.replace("ABCDEFG", f"SN{i}") for i in range(smart_info._PARSE_CACHE_SIZE * 2)]
+  with ThreadPoolExecutor(8) as pool:
+    results = list(pool.map(lambda o: parse_smart_output_cached(o, "/dev/sda"), outputs * 4))
+  assert [r["serial"] for r in results] == [f"SN{i}" for i in range(len(outputs))] * 4
+  assert len(smart_info._PARSE_CACHE) <= smart_info._PARSE_CACHE_SIZE
+
+
+def _fake_arun(outputs, delays):
+  async def arun_smartctl(smartctl, device):
+    # finish in a different order than requested
+    await asyncio.sleep(delays[device])
+    return outputs[device]
+  return arun_smartctl
+
+
+def test_run_smartctl_all_keeps_device_order(monkeypatch):
+  outputs = {"/dev/sda": SAMPLE_ATA, "/dev/nvme0": SAMPLE_NVME}
+  monkeypatch.setattr(smart_info, "arun_smartctl", _fake_arun(outputs, {"/dev/sda": 0.02, "/dev/nvme0": 0}))
+  assert smart_info.run_smartctl_all("smartctl", ["/dev/sda", "/dev/nvme0"]) == [SAMPLE_ATA, SAMPLE_NVME]
+
+
+def test_main_all_json(monkeypatch, capsys):
+  outputs = {"/dev/sda": SAMPLE_ATA, "/dev/nvme0": SAMPLE_NVME}
+  calls = []
+  fake = _fake_arun(outputs, {"/dev/sda": 0.02, "/dev/nvme0": 0})
+
+  async def arun_smartctl(smartctl, device):
+    calls.append(device)
+    return await fake(smartctl, device)
+
+  monkeypatch.setattr(smart_info, "find_smartctl", lambda: "smartctl")
+  monkeypatch.setattr(smart_info, "list_devices", lambda smartctl: ["/dev/sda", "/dev/nvme0", "/dev/sda"])
+  monkeypatch.setattr(smart_info, "arun_smartctl", arun_smartctl)
+  assert smart_info.main(["--all", "--json"]) == 0
+  result = json.loads(capsys.readouterr().out)
+  # duplicate scan entries are queried once
+  assert sorted(calls) == ["/dev/nvme0", "/dev/sda"]
+  assert list(result) == ["/dev/sda", "/dev/nvme0"]
+  assert result["/dev/sda"]["model"] == "TestDisk 1TB"
+  assert result["/dev/sda"]["attributes"][0]["name"] == "Raw_Read_Error_Rate"
+  assert result["/dev/nvme0"]["nvme_health"]["temperature"]["value"] == 29
+  assert "raw" not in result["/dev/sda"]
+
+
+DUMPS_SAMPLE = {"model": "Disk \ufffd", "nvme_health": {"data_units_read": {"value": 2 ** 70, "unit": None}}}
+
+
+def test_dumps_stdlib_fallback(monkeypatch):
+  monkeypatch.setattr(smart_info, "orjson", None)
+  out = _dumps(DUMPS_SAMPLE)
+  assert "Disk \ufffd" in out
+  assert json.loads(out) == DUMPS_SAMPLE
+  assert out == json.dumps(DUMPS_SAMPLE, indent=2, ensure_ascii=False)
+
+
+def test_dumps_backends_agree(monkeypatch):
+  pytest.importorskip("orjson")
+  with_orjson = [_dumps(DUMPS_SAMPLE), _dumps(parse_smart_output(SAMPLE_NVME))]
+  monkeypatch.setattr(smart_info, "orjson", None)
+  assert with_orjson == [_dumps(DUMPS_SAMPLE), _dumps(parse_smart_output(SAMPLE_NVME))]
+
+
+def test_iter_smartctl_replaces_invalid_utf8(tmp_path):
+  fake = tmp_path / "smartctl"
+  fake.write_text(f"#!{sys.executable}\nimport sys\nsys.stdout.buffer.write(b'Device Model: Disk \\xff\\n')\n")
+  fake.chmod(0o755)
+  parsed = parse_smart_output(iter_smartctl(str(fake), "/dev/sda"))
+  assert parsed["model"] == "Disk \ufffd"